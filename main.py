@@ -1,10 +1,19 @@
 import re
 import os
-import glob
+import hashlib
 import json
 import logging
+import tempfile
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from PIL import Image
-import pytesseract
+from tesserocr import OEM, PSM, PyTessBaseAPI
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -21,18 +30,55 @@ POSITION_FIELDS = {
 
 ALLOWED_IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif'}
 
+# Directory holding OCR output keyed by image content hash and OCR settings
+OCR_CACHE_DIR = ".ocrcache"
+
+# Bump when OCR output changes for reasons not captured by the settings below
+OCR_CACHE_VERSION = 1
+
+# Tesseract settings, equivalent to '--oem 3 --psm 6'; adjust as needed
+OCR_PSM = PSM.SINGLE_BLOCK
+OCR_OEM = OEM.DEFAULT
+
+# Longest image side, in pixels, passed on to thresholding and OCR
+MAX_OCR_DIMENSION = 2000
+
+# Grayscale cutoff for binarization; pixels at or above it become white
+BINARY_THRESHOLD = 128
+
+# Header line preceding each player's weekly projection values
+PROJECTIONS_HEADER = "WEEK 13 PROJECTIONS"
+
+# Parser states for parse_projections_from_file
+_SEEK_RANK = 0
+_EXPECT_PLAYER_HEADER = 1
+_EXPECT_RANK = 2
+_EXPECT_NAME = 3
+_SKIP_NAME = 4
+_EXPECT_TEAM = 5
+_SEEK_PROJECTIONS = 6
+
+# Matches combined OCR lines like "Amon-Ra St. Brown (WR) 70.5 Receiving Yards"
+_LINE_RE = re.compile(r"(.+?)\s\((.+?)\)\s([\d.]+)\sReceiving Yards")
+
 def parse_number(value):
     """
     Convert a string to an int if possible, otherwise to a float.
     Returns None if conversion fails.
     """
     try:
+        # Fast path: pick the conversion up front so floats don't raise from int()
+        if '.' in value or 'e' in value or 'E' in value:
+            return float(value)
         return int(value)
     except ValueError:
-        try:
-            return float(value)
-        except ValueError:
-            return None
+        pass
+
+    # Remaining float spellings such as 'nan' or 'inf'
+    try:
+        return float(value)
+    except ValueError:
+        return None
 
 def clean_player_name(raw_name):
     """
@@ -49,103 +95,135 @@ def clean_team_name(raw_team):
         return raw_team[:-2].strip()
     return raw_team.strip()
 
-def parse_projections_by_position(lines, i, position):
+def _parse_truncated_projections(position, values):
     """
-    Parse projection fields based on the player's position using POSITION_FIELDS mapping.
-    Returns a dictionary of projections and the updated line index.
+    Build projections from the fields available when the file ends mid-entry.
     """
-    projections = {}
-    fields = POSITION_FIELDS.get(position)
-    
-    if not fields:
-        logger.warning(f"No projection fields defined for position: {position}")
-        return projections, i
+    fields = POSITION_FIELDS[position]
+    logger.error(f"Unexpected end of file while parsing projections for {position} at field '{fields[len(values)]}'")
+    return dict(zip(fields, map(parse_number, values)))
+
+_POSITION_PARSER_TEMPLATE = """
+def _parser(lines):
+    values = tuple(_islice(lines, {count}))
+    if len(values) < {count}:
+        return _parse_truncated({position!r}, values)
+    return {{{entries}}}
+"""
+
+def _build_position_parser(position, fields):
+    """
+    Generate a projection parser specialized to one position's field list.
+    The generated function reads all fields at once and returns a dict literal,
+    with no per-field loop.
+    """
+    entries = ", ".join(f"{field!r}: _pn(values[{idx}])" for idx, field in enumerate(fields))
+    source = _POSITION_PARSER_TEMPLATE.format(position=position, count=len(fields), entries=entries)
+    namespace = {
+        "_islice": islice,
+        "_pn": parse_number,
+        "_parse_truncated": _parse_truncated_projections,
+    }
+    exec(source, namespace)
+
+    # The generated function has a fixed name so any position key (e.g. "D/ST") compiles
+    parser = namespace["_parser"]
+    parser.__name__ = parser.__qualname__ = f"_parse_{position}"
+    return parser
+
+# Specialized parsers generated from POSITION_FIELDS at import time
+POSITION_PARSERS = {
+    position: _build_position_parser(position, fields)
+    for position, fields in POSITION_FIELDS.items()
+}
 
-    for field in fields:
-        if i >= len(lines):
-            logger.error(f"Unexpected end of file while parsing projections for {position} at line {i}")
-            break
-        value = parse_number(lines[i].strip())
-        projections[field] = value
-        i += 1
+def parse_projections_by_position(lines, position):
+    """
+    Parse projection fields based on the player's position using POSITION_PARSERS.
+    Consumes one already-stripped line per field from the `lines` iterator and
+    returns a dictionary of projections.
+    """
+    parser = POSITION_PARSERS.get(position)
+
+    if parser is None:
+        logger.warning(f"No projection fields defined for position: {position}")
+        return {}
 
-    return projections, i
+    return parser(lines)
 
 def parse_projections_from_file(file_path):
     """
     Parse player names and weekly projections from a single text file.
     Only lines preceded by 'Rank' and 'Player' headers are treated as player entries.
+    The file is streamed in a single pass, dispatching on each line according to
+    where we are in the current player entry.
     """
     try:
-        with open(file_path, "r") as file:
-            lines = file.readlines()
+        file = open(file_path, "r")
     except FileNotFoundError:
         logger.error(f"Projections file '{file_path}' not found.")
         return []
 
     players = []
-    i = 0
-    total_lines = len(lines)
-
-    while i < total_lines:
-        line = lines[i].strip()
-
-        if line == 'Rank' and (i + 1) < total_lines and lines[i + 1].strip() == 'Player':
-            i += 2  # Move to rank line
-            if i >= total_lines:
-                break
-
-            rank_line = lines[i].strip()
-            if not rank_line.isdigit():
-                logger.warning(f"Expected rank digit at line {i + 1}, got '{rank_line}'")
-                i += 1
+    state = _SEEK_RANK
+    player_name = team = position = None
+
+    with file:
+        # Strip each line once as it is read; everything below sees stripped lines
+        lines = map(str.strip, file)
+        for line in lines:
+            if state == _SEEK_PROJECTIONS:
+                if PROJECTIONS_HEADER in line:
+                    players.append({
+                        "name": player_name,
+                        "team": team,
+                        "position": position,
+                        "projections": parse_projections_by_position(lines, position)
+                    })
+                    state = _SEEK_RANK
                 continue
 
-            rank = int(rank_line)
-            i += 1  # Move to player name
-
-            if i >= total_lines:
-                break
-
-            raw_player_name = lines[i].strip()
-            player_name = clean_player_name(raw_player_name)
-            i += 2  # Skip to team and position
-
-            if i >= total_lines:
-                player = {
-                    "name": player_name,
-                    "team": "Unknown",
-                    "position": "Unknown",
-                    "projections": {}
-                }
-                players.append(player)
-                break
-
-            raw_team_position = lines[i].strip()
-            team = clean_team_name(raw_team_position)
-            position = raw_team_position[-2:].strip()
-            i += 1  # Move to next line
-
-            # Advance to 'WEEK 13 PROJECTIONS'
-            while i < total_lines and "WEEK 13 PROJECTIONS" not in lines[i]:
-                i += 1
-
-            if i < total_lines and "WEEK 13 PROJECTIONS" in lines[i]:
-                i += 1  # Move to projections data
-                projections, i = parse_projections_by_position(lines, i, position)
-            else:
-                projections = {}
-                logger.warning(f"Projections not found for player '{player_name}' at line {i + 1}")
-
-            player = {
-                "name": player_name,
-                "team": team,
-                "position": position,
-                "projections": projections
-            }
-            players.append(player)
-        else:
-            i += 1  # Move to next line
+            if state == _EXPECT_PLAYER_HEADER:
+                if line == 'Player':
+                    state = _EXPECT_RANK
+                    continue
+                state = _SEEK_RANK  # Not a header pair; re-examine this line
+
+            if state == _SEEK_RANK:
+                if line == 'Rank':
+                    state = _EXPECT_PLAYER_HEADER
+            elif state == _EXPECT_RANK:
+                if line.isdigit():
+                    state = _EXPECT_NAME
+                else:
+                    logger.warning(f"Expected rank digit after 'Rank'/'Player' headers, got '{line}'")
+                    state = _SEEK_RANK
+            elif state == _EXPECT_NAME:
+                player_name = clean_player_name(line)
+                state = _SKIP_NAME
+            elif state == _SKIP_NAME:
+                state = _EXPECT_TEAM  # Skip to team and position
+            elif state == _EXPECT_TEAM:
+                team = clean_team_name(line)
+                position = line[-2:].strip()
+                state = _SEEK_PROJECTIONS
+
+    # Handle a player entry cut off by the end of the file
+    if state in (_SKIP_NAME, _EXPECT_TEAM):
+        players.append({
+            "name": player_name,
+            "team": "Unknown",
+            "position": "Unknown",
+            "projections": {}
+        })
+    elif state == _SEEK_PROJECTIONS:
+        logger.warning(f"Projections not found for player '{player_name}' before end of file")
+        players.append({
+            "name": player_name,
+            "team": team,
+            "position": position,
+            "projections": {}
+        })
 
     logger.info(f"Total players parsed: {len(players)}")
     players_missing_projections = [p['name'] for p in players if not p.get("projections")]
@@ -156,35 +234,164 @@ def parse_projections_from_file(file_path):
 
 def preprocess_image(image_path):
     """
-    Preprocess the image to improve OCR accuracy by converting to grayscale and applying thresholding.
+    Preprocess the image to improve OCR accuracy by converting to grayscale, downscaling
+    images larger than MAX_OCR_DIMENSION and applying thresholding.
+    Returns a binary grayscale PIL image.
     """
     try:
         image = Image.open(image_path).convert('L')  # Convert to grayscale
-        image = image.point(lambda x: 0 if x < 128 else 255, '1')  # Apply thresholding
-        return image
+
+        # Downscale oversized screenshots; every later step scales with pixel count
+        if max(image.size) > MAX_OCR_DIMENSION:
+            image.thumbnail((MAX_OCR_DIMENSION, MAX_OCR_DIMENSION), Image.Resampling.LANCZOS)
+
+        # Apply thresholding as a single vectorized compare; keep 8-bit grayscale
+        # output since Tesseract unpacks 1-bit images anyway
+        arr = np.asarray(image, dtype=np.uint8)
+        return Image.fromarray((arr >= BINARY_THRESHOLD).view(np.uint8) * 255, mode='L')
     except Exception as e:
         logger.error(f"Error preprocessing image {image_path}: {e}")
         return None
 
-def extract_text_from_image(image_path):
+# Tesseract engine owned by the current OCR worker process
+_ocr_api = None
+
+def _init_ocr_worker():
     """
-    Perform OCR on an image to extract text.
+    Create this worker's Tesseract engine once, so the model loads once per worker.
     """
+    global _ocr_api
     try:
-        image = preprocess_image(image_path)
-        if image is None:
-            return ""
+        _ocr_api = PyTessBaseAPI(psm=OCR_PSM, oem=OCR_OEM)
+    except Exception as e:
+        logger.error(f"Error initializing Tesseract: {e}")
+        raise
 
-        # Define Tesseract configuration
-        custom_config = r'--oem 3 --psm 6'  # Adjust as needed
+def _ocr_image(image_path):
+    """
+    Preprocess and OCR one image with the worker's Tesseract engine.
+    Returns the extracted text, or None if the image could not be processed.
+    """
+    image = preprocess_image(image_path)
+    if image is None:
+        return None
 
-        # Perform OCR
-        text = pytesseract.image_to_string(image, config=custom_config)
-        logger.info(f"OCR completed for image: {image_path}")
-        return text
+    try:
+        _ocr_api.SetImage(image)
+        text = _ocr_api.GetUTF8Text()
     except Exception as e:
         logger.error(f"Error processing image {image_path}: {e}")
-        return ""
+        return None
+
+    logger.info(f"OCR completed for image: {image_path}")
+    return text
+
+def ocr_images_batch(image_paths):
+    """
+    Perform OCR on a batch of images across a pool of worker processes.
+    Each worker keeps one persistent tesserocr engine, so the model is loaded
+    once per worker rather than once per image, and images never leave the
+    worker that preprocessed them.
+    Returns the extracted text for each image, in input order, with None for
+    images that could not be processed.
+    """
+    if not image_paths:
+        return []
+
+    # map() preserves input order. Don't start more workers than there are images.
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(len(image_paths), os.cpu_count() or 1),
+            initializer=_init_ocr_worker,
+        ) as executor:
+            return list(executor.map(_ocr_image, image_paths))
+    except Exception as e:
+        logger.error(f"Error running OCR workers: {e}")
+        return [None] * len(image_paths)
+
+def image_cache_key(image_path):
+    """
+    Hash the image file contents together with the preprocessing and engine settings
+    to key the OCR cache, so changing any of them invalidates earlier entries.
+    Content hashing (rather than mtime) keeps the cache valid across copies and touches.
+    """
+    settings = (OCR_CACHE_VERSION, MAX_OCR_DIMENSION, BINARY_THRESHOLD, int(OCR_PSM), int(OCR_OEM))
+    key = hashlib.blake2b(repr(settings).encode(), digest_size=16)
+    with open(image_path, "rb") as image_file:
+        key.update(image_file.read())
+    return key.hexdigest()
+
+def write_cache_entry(cache_path, text):
+    """
+    Write a cache entry atomically so an interrupted run never leaves a truncated file behind.
+    The cache is best-effort: failures are logged and otherwise ignored.
+    """
+    temp_path = None
+    try:
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=os.path.dirname(cache_path), suffix=".tmp", delete=False
+        ) as temp_file:
+            temp_path = temp_file.name
+            temp_file.write(text)
+        os.replace(temp_path, cache_path)
+    except (OSError, UnicodeEncodeError) as e:
+        logger.warning(f"Could not write OCR cache entry {cache_path}: {e}")
+        if temp_path is not None:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+def extract_text_from_images(image_paths):
+    """
+    Perform OCR on all images, reusing cached text for images processed in earlier runs.
+    Only cache misses are sent to Tesseract; their results are written back to OCR_CACHE_DIR.
+    Returns the extracted text for each image, in input order.
+    """
+    texts = [""] * len(image_paths)
+    miss_indices = []
+    miss_keys = []
+
+    for idx, image_path in enumerate(image_paths):
+        try:
+            key = image_cache_key(image_path)
+        except OSError as e:
+            logger.error(f"Error reading image {image_path}: {e}")
+            continue
+
+        cache_path = os.path.join(OCR_CACHE_DIR, f"{key}.txt")
+        if os.path.isfile(cache_path):
+            try:
+                with open(cache_path, "r", encoding="utf-8") as cache_file:
+                    texts[idx] = cache_file.read()
+                logger.info(f"Using cached OCR text for image: {image_path}")
+                continue
+            except (OSError, UnicodeDecodeError) as e:
+                logger.warning(f"Could not read OCR cache entry {cache_path}: {e}")
+
+        miss_indices.append(idx)
+        miss_keys.append(key)
+
+    if not miss_indices:
+        return texts
+
+    ocr_texts = ocr_images_batch([image_paths[idx] for idx in miss_indices])
+
+    try:
+        os.makedirs(OCR_CACHE_DIR, exist_ok=True)
+        cache_writable = True
+    except OSError as e:
+        logger.warning(f"Could not create OCR cache directory '{OCR_CACHE_DIR}': {e}")
+        cache_writable = False
+
+    for idx, key, text in zip(miss_indices, miss_keys, ocr_texts):
+        if text is None:
+            continue  # Don't cache failures
+        texts[idx] = text
+        if cache_writable:
+            write_cache_entry(os.path.join(OCR_CACHE_DIR, f"{key}.txt"), text)
+
+    return texts
 
 def parse_line_data(extracted_text):
     """
@@ -207,9 +414,9 @@ def parse_line_data(extracted_text):
 
     # Parse combined lines
     player_lines = {}
+    _match = _LINE_RE.match
     for line in combined_lines:
-        # Match lines like "Amon-Ra St. Brown (WR) 70.5 Receiving Yards"
-        match = re.match(r"(.+?)\s\((.+?)\)\s([\d.]+)\sReceiving Yards", line)
+        match = _match(line)
         if match:
             player_name = match.group(1).strip()
             position = match.group(2).strip()
@@ -228,54 +435,76 @@ def parse_line_data(extracted_text):
 def compare_projections_with_lines(projections, player_lines):
     """
     Compare projections with line data to calculate deltas and suggest bets.
+    Deltas are computed over parallel NumPy arrays, with NaN marking a missing
+    projection or line. Results are returned sorted by absolute delta in
+    descending order, followed by entries without a delta.
     """
-    results = []
+    names = []
+    positions = []
+    projected = []
+    line_values = []
 
     for player in projections:
         name = player.get("name", "Unknown")
-        position = player.get("position", "Unknown")
         projections_data = player.get("projections", {})
-        projected_yards = projections_data.get("receiving_yards")  # Adjust as needed based on position
+        player_line = player_lines.get(name)
 
-        if name in player_lines:
-            line_value = player_lines[name]["line"]
+        names.append(name)
+        positions.append(player.get("position", "Unknown"))
+        projected.append(projections_data.get("receiving_yards"))  # Adjust as needed based on position
+        line_values.append(player_line["line"] if player_line is not None else None)
 
-            if projected_yards is None:
-                # Handle missing projection
-                delta = None
-                suggestion = "N/A (Missing Projections)"
-            else:
-                # Calculate delta and suggestion
-                delta = projected_yards - line_value
-                suggestion = "Over" if delta > 0 else "Under"
-
-            results.append({
-                "name": name,
-                "position": position,
-                "projected_yards": projected_yards if projected_yards is not None else "N/A",
-                "line": line_value,
-                "delta": round(delta, 2) if delta is not None else "N/A",
-                "suggestion": suggestion
-            })
-        else:
+    proj = np.array([np.nan if v is None else v for v in projected], dtype=np.float64)
+    lines_arr = np.array([np.nan if v is None else v for v in line_values], dtype=np.float64)
+
+    # Sort on the displayed (rounded) delta so rows that show the same delta keep
+    # input order; NaN deltas sort last
+    delta = proj - lines_arr
+    order = np.argsort(-np.abs(np.round(delta, 2)), kind="stable")
+    has_line = ~np.isnan(lines_arr)
+    has_delta = ~np.isnan(delta)
+
+    results = []
+    for idx in order.tolist():
+        projected_yards = projected[idx]
+
+        if not has_line[idx]:
             # Player does not have a line
-            results.append({
-                "name": name,
-                "position": position,
-                "projected_yards": projected_yards if projected_yards is not None else "N/A",
-                "line": "N/A",
-                "delta": "N/A",
-                "suggestion": "No Line Available"
-            })
+            line_value = "N/A"
+            delta_value = "N/A"
+            suggestion = "No Line Available"
+        elif not has_delta[idx]:
+            # Handle missing projection
+            line_value = line_values[idx]
+            delta_value = "N/A"
+            suggestion = "N/A (Missing Projections)"
+        else:
+            line_value = line_values[idx]
+            delta_value = round(float(delta[idx]), 2)
+            suggestion = "Over" if delta[idx] > 0 else "Under"
+
+        results.append({
+            "name": names[idx],
+            "position": positions[idx],
+            "projected_yards": projected_yards if projected_yards is not None else "N/A",
+            "line": line_value,
+            "delta": delta_value,
+            "suggestion": suggestion
+        })
 
     return results
 
 def save_results_to_json(results, output_file="comparison_results.json"):
     """
     Save the comparison results to a JSON file.
+    Uses orjson when available, otherwise falls back to compact output from the json module.
     """
-    with open(output_file, 'w') as json_file:
-        json.dump(results, json_file, indent=4)
+    if orjson is not None:
+        with open(output_file, 'wb') as json_file:
+            json_file.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_file, 'w') as json_file:
+            json.dump(results, json_file)
     logger.info(f"Results saved to {output_file}")
 
 def main():
@@ -291,19 +520,26 @@ def main():
         logger.error("No projections to process. Exiting.")
         return
 
-    # Perform OCR on all images in the images_directory
-    all_extracted_text = ""
-    image_paths = glob.glob(os.path.join(images_directory, "*.*"))
-
-    logger.info(f"Found {len(image_paths)} files in '{images_directory}' directory.")
+    # Perform OCR on all images in the images_directory, skipping non-image files
+    ocr_paths = []
+    file_count = 0
+    try:
+        with os.scandir(images_directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                file_count += 1
+                if os.path.splitext(entry.name)[1].lower() not in ALLOWED_IMAGE_EXTENSIONS:
+                    logger.info(f"Skipping non-image file: {entry.path}")
+                    continue
+                ocr_paths.append(entry.path)
+    except FileNotFoundError:
+        logger.error(f"Images directory '{images_directory}' not found. Exiting.")
+        return
 
-    for image_path in image_paths:
-        if not os.path.splitext(image_path)[1].lower() in ALLOWED_IMAGE_EXTENSIONS:
-            logger.info(f"Skipping non-image file: {image_path}")
-            continue
+    logger.info(f"Found {file_count} files in '{images_directory}' directory.")
 
-        extracted_text = extract_text_from_image(image_path)
-        all_extracted_text += extracted_text + "\n"
+    all_extracted_text = "\n".join(extract_text_from_images(ocr_paths))
 
     if not all_extracted_text.strip():
         logger.error("No text extracted from images. Exiting.")
@@ -315,29 +551,24 @@ def main():
         logger.error("No player lines parsed from images. Exiting.")
         return
 
-    # Compare projections with line data
-    comparison_results = compare_projections_with_lines(projections, player_lines)
-    if not comparison_results:
+    # Compare projections with line data, sorted by absolute delta in descending order
+    sorted_results = compare_projections_with_lines(projections, player_lines)
+    if not sorted_results:
         logger.error("No comparison results to display. Exiting.")
         return
 
-    # Sort the results by absolute delta values in descending order
-    sorted_results = sorted(
-        comparison_results,
-        key=lambda x: abs(x['delta']) if isinstance(x['delta'], (int, float)) else -float('inf'),
-        reverse=True
-    )
-
-    # Display the sorted results
-    logger.info("\nComparison Results (Sorted by Delta):")
+    # Display the sorted results as a single log record
+    display_lines = ["\nComparison Results (Sorted by Delta):"]
+    separator = "-" * 30
     for result in sorted_results:
-        logger.info(f"Player: {result['name']}")
-        logger.info(f"  Position: {result['position']}")
-        logger.info(f"  Projected Yards: {result['projected_yards']}")
-        logger.info(f"  Line: {result['line']}")
-        logger.info(f"  Delta: {result['delta']}")
-        logger.info(f"  Suggestion: {result['suggestion']}")
-        logger.info("-" * 30)
+        display_lines.append(f"Player: {result['name']}")
+        display_lines.append(f"  Position: {result['position']}")
+        display_lines.append(f"  Projected Yards: {result['projected_yards']}")
+        display_lines.append(f"  Line: {result['line']}")
+        display_lines.append(f"  Delta: {result['delta']}")
+        display_lines.append(f"  Suggestion: {result['suggestion']}")
+        display_lines.append(separator)
+    logger.info("\n".join(display_lines))
 
     # Save results to JSON
     save_results_to_json(sorted_results)